@@ -8,17 +8,18 @@ if __name__ == "__main__":
             package_data={
                 "simpleguardhome": [
                     "templates/*",
-                    "favicon.ico"
+                    "static/*"
                 ]
             },
             include_package_data=True,
             install_requires=[
                 "fastapi",
-                "uvicorn",
+                "uvicorn[standard]",
                 "python-dotenv",
-                "httpx",
+                "httpx[http2]",
                 "pydantic",
                 "jinja2",
+                "orjson",
             ]
         )
     except Exception as e:
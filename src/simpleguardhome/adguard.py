@@ -1,21 +1,67 @@
-from typing import Dict, List, Optional, Set
-from pydantic import BaseModel, Field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from pydantic import BaseModel, Field, constr
+import asyncio
 import httpx
 import logging
-import re
-import json
+import orjson
+import string
+import tempfile
+import uuid
+import os
+import random
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 from .config import settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Constants for rule validation and backup
-DOMAIN_PATTERN = re.compile(r'^[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$')
+DOMAIN_LABEL_CHARS = frozenset(string.ascii_letters + string.digits + '-')
+RULE_SANITIZE_TABLE = str.maketrans('', '', '<>"\'')
 RULES_BACKUP_DIR = Path("rules_backup")
-RULES_BACKUP_DIR.mkdir(exist_ok=True)
+RULES_BACKUP_KEEP = 50
+_backup_dir_ready = False
+
+# Constants for response caching (seconds)
+STATUS_CACHE_TTL = settings.ADGUARD_STATUS_CACHE_TTL
+CHECK_CACHE_TTL = settings.ADGUARD_CHECK_CACHE_TTL
+STATUS_REFRESH_INTERVAL = settings.ADGUARD_STATUS_REFRESH_INTERVAL
+# Negative and error results are cached more briefly, never longer than the configured TTL
+CHECK_CACHE_NOT_FOUND_TTL = min(settings.ADGUARD_CHECK_CACHE_NEGATIVE_TTL, CHECK_CACHE_TTL)
+CHECK_CACHE_ERROR_TTL = min(1.0, CHECK_CACHE_TTL)
+CHECK_CACHE_MAX_ENTRIES = 4096
+
+# Request size limits
+CHECK_BATCH_MAX_NAMES = 100
+CHECK_BATCH_MAX_LOOKUPS = 500
+DOMAIN_MAX_LENGTH = 253
+SET_RULES_MAX_RULES = 16
+RULE_MAX_LENGTH = 512
+
+# Constants for retrying transient connection failures (seconds)
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.2
+RETRY_JITTER = 0.1
+
+JSON_CONTENT_TYPE = {"Content-Type": "application/json"}
+
+# Connection settings are read from the environment once per process
+ADGUARD_CONTROL_URL = f"{settings.adguard_base_url}/control"
+# Login body is encoded once rather than re-serialized on every (re)authentication
+_ADGUARD_LOGIN_BODY: Optional[bytes] = None
+if settings.ADGUARD_USERNAME and settings.ADGUARD_PASSWORD:
+    _ADGUARD_LOGIN_BODY = orjson.dumps({
+        "name": settings.ADGUARD_USERNAME,
+        "password": settings.ADGUARD_PASSWORD
+    })
+
+# Shared HTTP client, reused by every AdGuardClient on the same event loop
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
 
 class AdGuardError(Exception):
     """Base exception for AdGuard Home API errors."""
@@ -67,13 +113,35 @@ class FilterStatus(BaseModel):
 
 class SetRulesRequest(BaseModel):
     """Request model for set_rules endpoint according to AdGuard spec."""
-    rules: List[str] = Field(..., description="List of filtering rules")
+    rules: List[str] = Field(..., description="List of filtering rules", max_length=SET_RULES_MAX_RULES)
+
+class CheckHostBatchRequest(BaseModel):
+    """Request model for the batch check_host endpoint."""
+    names: List[constr(max_length=DOMAIN_MAX_LENGTH)] = Field(
+        ..., description="Domain names to check", max_length=CHECK_BATCH_MAX_NAMES
+    )
+
+class CheckHostBatchItem(BaseModel):
+    """Per-domain result of a batch check_host request."""
+    name: str = Field(..., description="Domain name as checked")
+    result: Optional[FilterCheckHostResponse] = Field(None, description="Check result on success")
+    error: Optional[str] = Field(None, description="Error message on failure")
+
+def normalize_domain(domain: str) -> str:
+    """Strip surrounding whitespace and the root dot, and lowercase a domain name."""
+    return domain.strip().rstrip('.').lower()
 
 def validate_domain(domain: str) -> bool:
     """Validate domain name format."""
     if not domain or len(domain) > 255:
         return False
-    return bool(DOMAIN_PATTERN.match(domain))
+    # Each label is 1-63 ASCII letters, digits or hyphens, not starting or ending with a hyphen
+    for label in domain.split('.'):
+        if not 0 < len(label) <= 63 or label[0] == '-' or label[-1] == '-':
+            return False
+        if not DOMAIN_LABEL_CHARS.issuperset(label):
+            return False
+    return True
     
 def get_parent_domains(domain: str) -> List[str]:
     """Get all parent domains for a given domain, excluding the TLD.
@@ -95,244 +163,459 @@ def sanitize_rule(rule: str) -> str:
     """Sanitize and validate rule format."""
     # Remove any whitespace and normalize
     rule = rule.strip()
-    # Basic XSS/injection prevention
-    rule = rule.replace('<', '').replace('>', '').replace('"', '').replace("'", '')
-    return rule
+    # Basic XSS/injection prevention, stripping all unsafe characters in one pass
+    return rule.translate(RULE_SANITIZE_TABLE)
 
 def save_rules_backup(rules: List[str], action: str = "update") -> Path:
     """Save rules to backup file with timestamp."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = RULES_BACKUP_DIR / f"rules_{action}_{timestamp}.json"
-    with open(backup_file, 'w') as f:
-        json.dump({"rules": rules, "timestamp": timestamp}, f, indent=2)
-    logger.info(f"Saved rules backup to {backup_file}")
+    global _backup_dir_ready
+    if not _backup_dir_ready:
+        RULES_BACKUP_DIR.mkdir(exist_ok=True)
+        _backup_dir_ready = True
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    # The random suffix keeps concurrent backups from overwriting each other
+    backup_file = RULES_BACKUP_DIR / f"rules_{action}_{timestamp}_{uuid.uuid4().hex[:8]}.json"
+    # Write to a private temp file and rename so a crash never leaves a truncated backup
+    fd, tmp_name = tempfile.mkstemp(dir=RULES_BACKUP_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(orjson.dumps({"rules": rules, "timestamp": timestamp}, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_name, backup_file)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+    logger.info("Saved rules backup to %s", backup_file)
+    prune_rules_backups()
     return backup_file
 
+def prune_rules_backups(keep: int = RULES_BACKUP_KEEP):
+    """Delete all but the newest `keep` rules backup files."""
+    try:
+        backups = sorted(
+            RULES_BACKUP_DIR.glob("rules_*.json"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True
+        )
+    except OSError as e:
+        # Another process may be pruning concurrently; try again on the next save
+        logger.warning("Could not list rules backups for pruning: %s", e)
+        return
+    for old_file in backups[keep:]:
+        try:
+            old_file.unlink()
+        except OSError as e:
+            logger.warning("Could not remove old rules backup %s: %s", old_file, e)
+
 def load_rules_backup(backup_file: Path) -> List[str]:
     """Load rules from backup file."""
     try:
-        with open(backup_file) as f:
-            data = json.load(f)
+        with open(backup_file, 'rb') as f:
+            data = orjson.loads(f.read())
             return data.get("rules", [])
     except Exception as e:
-        logger.error(f"Error loading rules backup: {str(e)}")
+        logger.error("Error loading rules backup: %s", e)
         return []
 
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client for the running event loop, creating it on first use."""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            http2=settings.ADGUARD_HTTP2,
+            timeout=10.0,
+            limits=httpx.Limits(
+                max_keepalive_connections=settings.ADGUARD_MAX_KEEPALIVE,
+                max_connections=settings.ADGUARD_MAX_CONNECTIONS,
+                keepalive_expiry=settings.ADGUARD_KEEPALIVE_EXPIRY
+            )
+        )
+        _http_client_loop = loop
+        logger.info(
+            "Created shared AdGuard Home HTTP client (max_connections=%d, max_keepalive=%d, keepalive_expiry=%.1fs)",
+            settings.ADGUARD_MAX_CONNECTIONS, settings.ADGUARD_MAX_KEEPALIVE, settings.ADGUARD_KEEPALIVE_EXPIRY
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the shared HTTP client and its connection pool."""
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+        logger.info("Closed shared AdGuard Home HTTP client")
+    _http_client = None
+    _http_client_loop = None
+
+def check_cache_ttl(result: FilterCheckHostResponse) -> float:
+    """Get how long a check_host result may be cached, based on its reason.
+
+    Negative "no rule matched" results get a shorter TTL than filtered verdicts, and
+    upstream errors the shortest so they recover fast. A TTL of 0 disables caching.
+    """
+    if result.reason == "NotFilteredNotFound":
+        return CHECK_CACHE_NOT_FOUND_TTL
+    if result.reason == "NotFilteredError":
+        return CHECK_CACHE_ERROR_TTL
+    return CHECK_CACHE_TTL
+
 class AdGuardClient:
     """Client for interacting with AdGuard Home API according to OpenAPI spec."""
     
     def __init__(self):
         """Initialize the AdGuard Home API client."""
-        self.base_url = f"{settings.adguard_base_url}/control"
-        self.client = httpx.AsyncClient(
-            timeout=10.0,
-            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
-        )
+        self.base_url = ADGUARD_CONTROL_URL
+        self._login_url = f"{self.base_url}/login"
+        self._check_host_url = f"{self.base_url}/filtering/check_host"
+        self._status_url = f"{self.base_url}/filtering/status"
+        self._set_rules_url = f"{self.base_url}/filtering/set_rules"
         self._session_cookie = None
-        self._auth = None
-        if settings.ADGUARD_USERNAME and settings.ADGUARD_PASSWORD:
-            self._auth = {
-                "name": settings.ADGUARD_USERNAME,
-                "password": settings.ADGUARD_PASSWORD
-            }
-        logger.info(f"Initialized AdGuard Home client with base URL: {self.base_url}")
+        self._cookie_header: Dict[str, str] = {}
+        self._login_body = _ADGUARD_LOGIN_BODY
+        self._status_cache: Optional[Tuple[float, FilterStatus]] = None
+        self._last_status: Optional[FilterStatus] = None
+        self._user_rules: Optional[Tuple[FilterStatus, FrozenSet[str]]] = None
+        self._check_cache: "OrderedDict[str, Tuple[float, FilterCheckHostResponse]]" = OrderedDict()
+        self._inflight_checks: Dict[str, "asyncio.Task[FilterCheckHostResponse]"] = {}
+        # Bumped on every invalidation so fetches started before a rules write are not cached
+        self._cache_generation = 0
+        self._rules_lock = asyncio.Lock()
+        logger.debug("Initialized AdGuard Home client with base URL: %s", self.base_url)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client shared across AdGuardClient instances."""
+        return get_http_client()
 
     async def login(self) -> bool:
         """Authenticate with AdGuard Home and get session cookie."""
-        if not self._auth:
+        if not self._login_body:
             logger.warning("No credentials configured, skipping authentication")
             return False
 
-        url = f"{self.base_url}/login"
-        
         try:
             logger.info("Authenticating with AdGuard Home")
-            response = await self.client.post(url, json=self._auth)
+            response = await self._request_with_retry(
+                "POST", self._login_url, content=self._login_body, headers=JSON_CONTENT_TYPE
+            )
             response.raise_for_status()
             
             cookies = response.cookies
             if 'agh_session' in cookies:
-                self._session_cookie = cookies['agh_session']
+                self._set_session_cookie(cookies['agh_session'])
                 logger.info("Successfully authenticated with AdGuard Home")
                 return True
             else:
                 logger.error("No session cookie received after login")
                 raise AdGuardAPIError("Authentication failed: No session cookie received")
                 
+        except AdGuardError:
+            raise
         except httpx.ConnectError as e:
-            logger.error(f"Connection error during login: {str(e)}")
+            logger.error("Connection error during login: %s", e)
             raise AdGuardConnectionError(f"Failed to connect to AdGuard Home: {str(e)}")
         except httpx.HTTPError as e:
-            logger.error(f"HTTP error during login: {str(e)}")
+            logger.error("HTTP error during login: %s", e)
             raise AdGuardAPIError(f"Authentication failed: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error during login: {str(e)}")
+            logger.error("Unexpected error during login: %s", e)
             raise AdGuardError(f"Authentication error: {str(e)}")
 
+    async def _request_with_retry(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying connection errors and 5xx responses with jittered backoff."""
+        for attempt in range(RETRY_ATTEMPTS - 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code < 500:
+                    return response
+                logger.warning("AdGuard Home returned %d, retrying (attempt %d)", response.status_code, attempt + 1)
+            except httpx.ConnectError as e:
+                logger.warning("Connection to AdGuard Home failed, retrying (attempt %d): %s", attempt + 1, e)
+            delay = RETRY_BACKOFF * (2 ** attempt) + random.uniform(-RETRY_JITTER, RETRY_JITTER)
+            await asyncio.sleep(max(0.0, delay))
+        # Final attempt surfaces whatever error or response it gets
+        return await self.client.request(method, url, **kwargs)
+
+    def _set_session_cookie(self, value: Optional[str]):
+        """Store the session cookie and the Cookie header rendered from it."""
+        self._session_cookie = value
+        self._cookie_header = {'Cookie': f'agh_session={value}'} if value else {}
+
     async def _ensure_authenticated(self):
         """Ensure we have a valid session cookie."""
         if not self._session_cookie:
             await self.login()
 
-    async def check_domain(self, domain: str) -> FilterCheckHostResponse:
+    def _headers(self, json_body: bool = False) -> Dict[str, str]:
+        """Get request headers for the current session."""
+        if json_body:
+            return {**self._cookie_header, **JSON_CONTENT_TYPE}
+        return self._cookie_header
+
+    async def _authed_request(self, method: str, url: str, action: str, **kwargs) -> httpx.Response:
+        """Send an authenticated request, re-authenticating once if the session expired.
+
+        HTTP failures are mapped to AdGuardConnectionError/AdGuardAPIError; `action`
+        describes the operation for log messages.
+        """
+        await self._ensure_authenticated()
+        json_body = "json" in kwargs
+        if json_body:
+            # Encode JSON bodies with orjson rather than httpx's stdlib json encoder
+            kwargs["content"] = orjson.dumps(kwargs.pop("json"))
+        try:
+            response = await self._request_with_retry(method, url, headers=self._headers(json_body), **kwargs)
+            if response.status_code == 401:
+                logger.info("Session expired, attempting reauth")
+                await self.login()
+                response = await self._request_with_retry(method, url, headers=self._headers(json_body), **kwargs)
+            response.raise_for_status()
+            return response
+        except httpx.ConnectError as e:
+            logger.error("Connection error while %s: %s", action, e)
+            raise AdGuardConnectionError(f"Failed to connect to AdGuard Home: {str(e)}")
+        except httpx.HTTPError as e:
+            logger.error("HTTP error while %s: %s", action, e)
+            raise AdGuardAPIError(f"AdGuard Home API error: {str(e)}")
+
+    def invalidate_cache(self):
+        """Drop cached filter status and domain check results."""
+        self._cache_generation += 1
+        self._status_cache = None
+        self._user_rules = None
+        self._last_status = None
+        self._check_cache.clear()
+        # Lookups already in flight may carry pre-write results, so later callers start fresh ones
+        self._inflight_checks.clear()
+
+    async def check_domain(self, domain: str, use_cache: bool = True) -> FilterCheckHostResponse:
         """Check if a domain is blocked by AdGuard Home according to spec."""
-        # Validate domain format
+        # Domain names are case-insensitive, so share one cache entry per name
+        domain = normalize_domain(domain)
         if not validate_domain(domain):
             raise AdGuardValidationError(f"Invalid domain format: {domain}")
 
-        await self._ensure_authenticated()
-        url = f"{self.base_url}/filtering/check_host"
-        headers = {}
-        
-        if self._session_cookie:
-            headers['Cookie'] = f'agh_session={self._session_cookie}'
-        
+        cached = self._check_cache.get(domain) if use_cache else None
+        if cached and time.monotonic() < cached[0]:
+            self._check_cache.move_to_end(domain)
+            return cached[1]
+
+        # Concurrent lookups for the same domain share a single upstream request. The lookup runs
+        # as its own task and every caller awaits it through shield, so a cancelled caller never
+        # cancels it for the others
+        task = self._inflight_checks.get(domain)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_cache_check(domain))
+            self._inflight_checks[domain] = task
+            task.add_done_callback(partial(self._forget_inflight_check, domain))
+        return await asyncio.shield(task)
+
+    def _forget_inflight_check(self, domain: str, task: "asyncio.Task[FilterCheckHostResponse]"):
+        """Drop a finished lookup from the in-flight table."""
+        if self._inflight_checks.get(domain) is task:
+            del self._inflight_checks[domain]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_and_cache_check(self, domain: str) -> FilterCheckHostResponse:
+        """Look up a domain and store the result in the check cache."""
+        generation = self._cache_generation
+        result = await self._fetch_domain_check(domain)
+        ttl = check_cache_ttl(result)
+        if ttl <= 0 or generation != self._cache_generation:
+            return result
+        self._check_cache[domain] = (time.monotonic() + ttl, result)
+        self._check_cache.move_to_end(domain)
+        if len(self._check_cache) > CHECK_CACHE_MAX_ENTRIES:
+            self._check_cache.popitem(last=False)
+        return result
+
+    async def _fetch_domain_check(self, domain: str) -> FilterCheckHostResponse:
+        """Query AdGuard Home for a domain and its parent domains."""
+        action = f"checking domain {domain}"
         try:
-            logger.info(f"Checking domain: {domain}")
+            logger.debug("Checking domain: %s", domain)
             # Get all parent domains to check (excluding TLD)
             domains_to_check = get_parent_domains(domain)
+            own_result = None
             
-            for check_domain in domains_to_check:
-                params = {"name": check_domain}
-                response = await self.client.get(url, params=params, headers=headers)
-                
-                if response.status_code == 401:
-                    logger.info("Session expired, attempting reauth")
-                    await self.login()
-                    if self._session_cookie:
-                        headers['Cookie'] = f'agh_session={self._session_cookie}'
-                    response = await self.client.get(url, params=params, headers=headers)
-                
-                response.raise_for_status()
-                result = response.json()
+            for parent_domain in domains_to_check:
+                response = await self._authed_request(
+                    "GET", self._check_host_url, action, params={"name": parent_domain}
+                )
+                # Parse and validate in one pass from the raw bytes
+                result = FilterCheckHostResponse.model_validate_json(response.content)
                 
                 # If this domain is filtered, return the result
-                if result.get("reason", "").startswith("Filtered"):
-                    logger.info(f"Domain {domain} is filtered due to parent domain {check_domain}")
-                    logger.info(f"Domain check result: {result}")
-                    return FilterCheckHostResponse(**result)
+                if result.reason.startswith("Filtered"):
+                    logger.info("Domain %s is filtered due to parent domain %s", domain, parent_domain)
+                    logger.debug("Domain check result: %s", result)
+                    return result
+                if parent_domain == domain:
+                    own_result = result
             
-            # If no parent domains are filtered, return the result for the original domain
-            params = {"name": domain}
-            response = await self.client.get(url, params=params, headers=headers)
-            result = response.json()
-            logger.info(f"Domain check result for {domain}: {result}")
-            return FilterCheckHostResponse(**result)
+            # If no parent domains are filtered, return the result for the original domain,
+            # reusing the response from the loop when the domain itself was checked there
+            result = own_result
+            if result is None:
+                response = await self._authed_request(
+                    "GET", self._check_host_url, action, params={"name": domain}
+                )
+                result = FilterCheckHostResponse.model_validate_json(response.content)
+            logger.debug("Domain check result for %s: %s", domain, result)
+            return result
             
-        except httpx.ConnectError as e:
-            logger.error(f"Connection error while checking domain {domain}: {str(e)}")
-            raise AdGuardConnectionError(f"Failed to connect to AdGuard Home: {str(e)}")
-        except httpx.HTTPError as e:
-            logger.error(f"HTTP error while checking domain {domain}: {str(e)}")
-            raise AdGuardAPIError(f"AdGuard Home API error: {str(e)}")
+        except AdGuardError:
+            raise
         except Exception as e:
-            logger.error(f"Unexpected error while checking domain {domain}: {str(e)}")
+            logger.error("Unexpected error while checking domain %s: %s", domain, e)
             raise AdGuardError(f"Unexpected error: {str(e)}")
 
-    async def get_filter_status(self) -> FilterStatus:
-        """Get the current filtering status according to spec."""
+    async def check_domains(self, domains: List[str], return_exceptions: bool = False) -> List[FilterCheckHostResponse]:
+        """Check several domains concurrently, returning results in input order."""
+        # Authenticate once up front so the concurrent checks don't all race to log in
         await self._ensure_authenticated()
-        url = f"{self.base_url}/filtering/status"
-        headers = {}
-        
-        if self._session_cookie:
-            headers['Cookie'] = f'agh_session={self._session_cookie}'
-        
+        return await asyncio.gather(
+            *(self.check_domain(domain) for domain in domains), return_exceptions=return_exceptions
+        )
+
+    async def get_filter_status(self, use_cache: bool = True) -> FilterStatus:
+        """Get the current filtering status according to spec."""
+        if use_cache and self._status_cache and time.monotonic() - self._status_cache[0] < STATUS_CACHE_TTL:
+            return self._status_cache[1]
+
         try:
-            logger.info("Getting filter status")
-            response = await self.client.get(url, headers=headers)
-            
-            if response.status_code == 401:
-                logger.info("Session expired, attempting reauth")
-                await self.login()
-                if self._session_cookie:
-                    headers['Cookie'] = f'agh_session={self._session_cookie}'
-                response = await self.client.get(url, headers=headers)
+            logger.debug("Getting filter status")
+            generation = self._cache_generation
+            response = await self._authed_request("GET", self._status_url, "getting filter status")
+            # Validate straight from the raw bytes instead of json() + FilterStatus(**result)
+            status = FilterStatus.model_validate_json(response.content)
+            logger.debug("Successfully retrieved filter status")
+            if generation == self._cache_generation:
+                self._status_cache = (time.monotonic(), status)
+                self._last_status = status
+            return status
             
-            response.raise_for_status()
-            result = response.json()
-            logger.info("Successfully retrieved filter status")
-            return FilterStatus(**result)
-            
-        except httpx.ConnectError as e:
-            logger.error(f"Connection error while getting filter status: {str(e)}")
-            raise AdGuardConnectionError(f"Failed to connect to AdGuard Home: {str(e)}")
-        except httpx.HTTPError as e:
-            logger.error(f"HTTP error while getting filter status: {str(e)}")
-            raise AdGuardAPIError(f"AdGuard Home API error: {str(e)}")
+        except AdGuardConnectionError:
+            # Serve the last known status while AdGuard Home is briefly unreachable
+            if use_cache and self._last_status is not None:
+                logger.warning("AdGuard Home unreachable, serving last known filter status")
+                return self._last_status
+            raise
+        except AdGuardError:
+            raise
         except Exception as e:
-            logger.error(f"Unexpected error while getting filter status: {str(e)}")
+            logger.error("Unexpected error while getting filter status: %s", e)
             raise AdGuardError(f"Unexpected error: {str(e)}")
     
+    async def get_user_rules(self, use_cache: bool = True) -> FrozenSet[str]:
+        """Get the user rules as a set for constant-time membership checks."""
+        status = await self.get_filter_status(use_cache=use_cache)
+        # Only rebuild the set when a different status object was fetched
+        if self._user_rules is None or self._user_rules[0] is not status:
+            self._user_rules = (status, frozenset(status.user_rules))
+        return self._user_rules[1]
+
+    async def refresh_filter_status(self, interval: float = STATUS_REFRESH_INTERVAL):
+        """Keep the filter status cache warm by refetching it every interval seconds until cancelled.
+
+        The cache keeps its configured TTL, so requests only skip AdGuard Home entirely
+        when the interval is shorter than STATUS_CACHE_TTL.
+        """
+        while True:
+            try:
+                await self.get_filter_status(use_cache=False)
+            except AdGuardError as e:
+                logger.warning("Background filter status refresh failed: %s", e)
+            await asyncio.sleep(interval)
+
     async def add_allowed_domain(self, domain: str) -> bool:
         """Add a domain to the allowed list using AdGuard filtering API."""
-        # Validate domain format
-        if not validate_domain(domain):
-            raise AdGuardValidationError(f"Invalid domain format: {domain}")
+        return await self.add_allowed_domains([domain])
 
-        await self._ensure_authenticated()
+    async def add_allowed_domains(self, domains: List[str]) -> bool:
+        """Add several domains to the allowed list with a single rules update."""
+        # Rules are written for the normalized name so they match check_domain and unblock_host
+        domains = [normalize_domain(domain) for domain in domains]
+        # Validate all domains before touching any rules
+        for domain in domains:
+            if not validate_domain(domain):
+                raise AdGuardValidationError(f"Invalid domain format: {domain}")
+
+        # Each update rewrites the whole rules list, so concurrent updates must not interleave
+        # their read, backups and write or one would drop the other's rules
+        async with self._rules_lock:
+            return await self._write_allowed_rules(domains)
+
+    async def _write_allowed_rules(self, domains: List[str]) -> bool:
+        """Append whitelist rules for validated domains, backing up the rules around the update."""
+        domain_list = ", ".join(domains)
+        old_backup = None
         
         try:
-            # First get current user rules
-            status = await self.get_filter_status()
-            current_rules = status.user_rules if status else []
+            # First get current user rules, bypassing the cache since we write them back
+            status = await self.get_filter_status(use_cache=False)
+            # Copy so the cached status isn't mutated before the update succeeds
+            current_rules = list(status.user_rules) if status else []
+            # Domain rules are case-insensitive, so compare against lowercased existing rules
+            rules_set = {rule.lower() for rule in current_rules}
+            
+            # Create sanitized whitelist rules, skipping any that are already present
+            new_rules = []
+            for domain in domains:
+                new_rule = sanitize_rule(f"@@||{domain}^")
+                if new_rule not in rules_set:
+                    new_rules.append(new_rule)
+                    rules_set.add(new_rule)
             
-            # Create sanitized whitelist rule
-            new_rule = sanitize_rule(f"@@||{domain}^")
+            # Nothing to write if every rule is already present
+            if not new_rules:
+                logger.info("Domains already whitelisted: %s", domain_list)
+                return True
             
             # Save backup of current rules
-            old_backup = save_rules_backup(current_rules, "before")
+            # Backups are written in a worker thread to keep file I/O off the event loop
+            old_backup = await asyncio.to_thread(save_rules_backup, current_rules, "before")
             
-            # Add rule if not already present
-            if new_rule not in current_rules:
-                current_rules.append(new_rule)
+            current_rules.extend(new_rules)
                 
             # Save backup of new rules before updating
-            new_backup = save_rules_backup(current_rules, "after")
+            new_backup = await asyncio.to_thread(save_rules_backup, current_rules, "after")
             
             # Update rules
-            url = f"{self.base_url}/filtering/set_rules"
-            data = {"rules": current_rules}
-            headers = {}
-            
-            if self._session_cookie:
-                headers['Cookie'] = f'agh_session={self._session_cookie}'
-            
-            logger.info(f"Updating rules list with whitelisted domain: {domain}")
-            response = await self.client.post(url, json=data, headers=headers)
-            
-            if response.status_code == 401:
-                logger.info("Session expired, attempting reauth")
-                await self.login()
-                if self._session_cookie:
-                    headers['Cookie'] = f'agh_session={self._session_cookie}'
-                response = await self.client.post(url, json=data, headers=headers)
-            
-            response.raise_for_status()
-            logger.info(f"Successfully updated rules list with whitelisted domain: {domain}")
+            logger.info("Updating rules list with whitelisted domains: %s", domain_list)
+            await self._authed_request(
+                "POST", self._set_rules_url, "updating rules", json={"rules": current_rules}
+            )
+            self.invalidate_cache()
+            logger.info("Successfully updated rules list with whitelisted domains: %s", domain_list)
             return True
             
-        except (httpx.ConnectError, httpx.HTTPError) as e:
+        except (AdGuardConnectionError, AdGuardAPIError) as e:
             # On error, try to restore from backup
-            logger.error(f"Error updating rules, attempting to restore from backup: {str(e)}")
-            if old_backup.exists():
+            if old_backup is not None and old_backup.exists():
+                logger.error("Error updating rules, attempting to restore from backup: %s", e)
                 try:
-                    old_rules = load_rules_backup(old_backup)
+                    old_rules = await asyncio.to_thread(load_rules_backup, old_backup)
                     if old_rules:
-                        await self.client.post(url, json={"rules": old_rules}, headers=headers)
+                        await self._authed_request(
+                            "POST", self._set_rules_url, "restoring rules", json={"rules": old_rules}
+                        )
                         logger.info("Successfully restored rules from backup")
                 except Exception as restore_error:
-                    logger.error(f"Failed to restore from backup: {str(restore_error)}")
+                    logger.error("Failed to restore from backup: %s", restore_error)
             raise
             
+        except AdGuardError:
+            raise
         except Exception as e:
-            logger.error(f"Unexpected error while whitelisting domain {domain}: {str(e)}")
+            logger.error("Unexpected error while whitelisting domains %s: %s", domain_list, e)
             raise AdGuardError(f"Unexpected error: {str(e)}")
     
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
-        logger.info("Closed AdGuard Home client")
+        """Release the client; the shared HTTP pool stays open for reuse."""
+        logger.debug("Closed AdGuard Home client")
         
     async def __aenter__(self):
         return self
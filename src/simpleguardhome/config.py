@@ -1,4 +1,5 @@
-from typing import Optional
+from functools import cached_property
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings  # type: ignore
 
@@ -10,12 +11,29 @@ class Settings(BaseSettings):
     ADGUARD_PORT: int = 3000
     ADGUARD_USERNAME: Optional[str] = None
     ADGUARD_PASSWORD: Optional[str] = None
-
-    @property
+    ADGUARD_HTTP2: bool = True
+    ADGUARD_MAX_CONNECTIONS: int = 10
+    ADGUARD_MAX_KEEPALIVE: int = 5
+    ADGUARD_KEEPALIVE_EXPIRY: float = 30.0
+    ADGUARD_STATUS_CACHE_TTL: float = 2.0
+    ADGUARD_CHECK_CACHE_TTL: float = 5.0
+    ADGUARD_CHECK_CACHE_NEGATIVE_TTL: float = 2.0
+    ADGUARD_STATUS_REFRESH_INTERVAL: float = 0.0
+    WEB_CONCURRENCY: int = 1
+    LOG_LEVEL: str = "INFO"
+    ACCESS_LOG: bool = True
+    CORS_ORIGINS: str = ""
+
+    @cached_property
     def adguard_base_url(self) -> str:
         """Get the base URL for AdGuard Home API."""
         return f"{self.ADGUARD_HOST}:{self.ADGUARD_PORT}"
 
+    @cached_property
+    def cors_origins(self) -> List[str]:
+        """Get the comma-separated CORS_ORIGINS as a list."""
+        return [o.strip() for o in self.CORS_ORIGINS.split(",") if o.strip()]
+
     class Config:
         env_file = ".env"
 
@@ -1,17 +1,25 @@
+import asyncio
+import hashlib
 import logging
+import logging.config
+import re
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
-from typing import Dict
+from typing import List, Tuple
 
 import httpx  # noqa: F401
+import orjson
+import uvicorn  # type: ignore
 from fastapi import (  # type: ignore  # noqa: F401
+    Depends,
     FastAPI,
-    Form,
     HTTPException,
     Request,
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
-from fastapi.responses import HTMLResponse, JSONResponse  # type: ignore
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html  # type: ignore
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response  # type: ignore
 from fastapi.staticfiles import StaticFiles  # type: ignore
 from fastapi.templating import Jinja2Templates  # type: ignore
 from pydantic import BaseModel, Field
@@ -22,57 +30,170 @@ from .adguard import (
     AdGuardConnectionError,
     AdGuardError,
     AdGuardValidationError,
+    CheckHostBatchItem,
+    CheckHostBatchRequest,
     FilterCheckHostResponse,
     FilterStatus,
     SetRulesRequest,
 )
-from .config import settings  # noqa: F401
+from .config import settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Whitelist rules have the form @@||domain^
+WHITELIST_RULE_RE = re.compile(r"^@@\|\|(?P<domain>[^^]+)\^$")
+WHITELIST_RULE_TEMPLATE = "@@||{}^"
+
+
+class OrjsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Serialize the record's core fields with orjson."""
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+
+# Applied once per worker by uvicorn, so every record goes through a single root handler
+LOGGING_CONFIG = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"json": {"()": OrjsonFormatter}},
+    "handlers": {"default": {"class": "logging.StreamHandler", "formatter": "json"}},
+    "loggers": {
+        "uvicorn": {"handlers": [], "propagate": True},
+        "uvicorn.error": {"handlers": [], "propagate": True},
+        "uvicorn.access": {"handlers": [], "propagate": True},
+    },
+    "root": {"level": settings.LOG_LEVEL.upper(), "handlers": ["default"]},
+}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared AdGuard Home client and close its connection pool on shutdown."""
+    # start() passes LOGGING_CONFIG to uvicorn; apply it here too when launched via the uvicorn CLI
+    if not logging.getLogger().handlers:
+        logging.config.dictConfig(LOGGING_CONFIG)
+    # Build the OpenAPI schema once per worker instead of on the first docs hit
+    app.state.openapi_bytes = orjson.dumps(app.openapi())
+    client = adguard.AdGuardClient()
+    app.state.adguard_client = client
+    app.state.filter_status_body = None
+    refresher = None
+    if adguard.STATUS_REFRESH_INTERVAL > 0:
+        refresher = asyncio.create_task(client.refresh_filter_status())
+    yield
+    if refresher is not None:
+        refresher.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresher
+    await adguard.close_http_client()
+
+
+def get_adguard_client(request: Request) -> adguard.AdGuardClient:
+    """Get the process-wide AdGuard Home client created in the lifespan handler."""
+    return request.app.state.adguard_client
+
+
 # Initialize API with proper OpenAPI info
 app = FastAPI(
     title="SimpleGuardHome",
     description="AdGuard Home REST API interface",
     version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    # Docs and schema routes are registered below so the schema is served from prebuilt bytes
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Add CORS middleware with security headers
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["X-Request-ID"]
-)
+# The UI is served same-origin, so CORS is only needed for configured origins
+if settings.cors_origins:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=False,  # The API uses no cookies or auth headers
+        allow_methods=["GET", "POST"],
+        allow_headers=["content-type", "x-request-id"],
+        expose_headers=["X-Request-ID"]
+    )
 
 # Setup templates and static directories
-templates_path = Path(__file__).parent / "templates"
-templates = Jinja2Templates(directory=str(templates_path))
-
-# Mount static files from package directory
-app.mount("/static", StaticFiles(directory=str(Path(__file__).parent)), name="static")
-
-# Serve favicon.ico directly
-from fastapi.responses import FileResponse
-favicon_path = Path(__file__).parent / "favicon.ico"
+PKG_DIR = Path(__file__).resolve().parent
+TEMPLATES_DIR = PKG_DIR / "templates"
+STATIC_DIR = PKG_DIR / "static"
+templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+# Templates ship with the package, so skip the per-lookup mtime check
+templates.env.auto_reload = False
+# The page has no per-request context, so render it once and serve the same bytes every time
+INDEX_HTML = templates.get_template("index.html").render().encode()
+INDEX_ETAG = '"%s"' % hashlib.blake2b(INDEX_HTML, digest_size=8).hexdigest()
+INDEX_HEADERS = {"ETag": INDEX_ETAG, "Cache-Control": "public, max-age=60"}
+FAVICON_HEADERS = {"Cache-Control": "public, max-age=86400, immutable"}
+
+# Mount only the dedicated static directory so package sources are never served
+app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+
+# The page links its icon under /static; this route only covers clients that ask for /favicon.ico
+# Read once at import so each request is served from memory without a stat or open
+FAVICON_BYTES = (STATIC_DIR / "favicon.ico").read_bytes()
 
 @app.get("/favicon.ico")
 async def favicon():
     """Serve favicon."""
-    return FileResponse(favicon_path)
+    return Response(FAVICON_BYTES, media_type="image/x-icon", headers=FAVICON_HEADERS)
+
+OPENAPI_URL = "/api/openapi.json"
+OPENAPI_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_schema(request: Request):
+    """Serve the prebuilt OpenAPI schema."""
+    return Response(request.app.state.openapi_bytes, media_type="application/json", headers=OPENAPI_HEADERS)
+
+@app.get("/api/docs", include_in_schema=False)
+async def swagger_docs():
+    """Serve the Swagger UI."""
+    return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{app.title} - Swagger UI")
+
+@app.get("/api/redoc", include_in_schema=False)
+async def redoc_docs():
+    """Serve the ReDoc UI."""
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{app.title} - ReDoc")
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+
+def model_response(model: BaseModel) -> Response:
+    """Serialize an already-validated model straight to a JSON response."""
+    return Response(model.model_dump_json(), media_type="application/json")
+
+
+STATUS_CACHE_CONTROL = "private, max-age=5"
+
+
+def encode_filter_status(app: FastAPI, filter_status: FilterStatus) -> Tuple[bytes, str]:
+    """Serialize a filter status and its ETag once per status object."""
+    cached = app.state.filter_status_body
+    if cached is None or cached[0] is not filter_status:
+        body = filter_status.model_dump_json().encode()
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        cached = app.state.filter_status_body = (filter_status, body, etag)
+    return cached[1], cached[2]
+
+
 # Response models matching AdGuard spec
 
 
@@ -81,52 +202,88 @@ class ErrorResponse(BaseModel):
     message: str = Field(..., description="The error message")
 
 
+class MessageResponse(BaseModel):
+    """Success message response model."""
+    message: str = Field(..., description="The result message")
+
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    """Render the home page."""
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request}
-    )
+    """Serve the prerendered home page."""
+    if request.headers.get("if-none-match") == INDEX_ETAG:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=INDEX_HEADERS)
+    return HTMLResponse(INDEX_HTML, headers=INDEX_HEADERS)
 
 
 @app.get(
     "/control/filtering/check_host",
-    response_model=FilterCheckHostResponse,
+    response_model=None,
     responses={
-        200: {"description": "OK"},
+        200: {"description": "OK", "model": FilterCheckHostResponse},
         400: {"description": "Bad Request", "model": ErrorResponse},
         503: {"description": "AdGuard Home service unavailable", "model": ErrorResponse}
     },
     tags=["filtering"]
 )
-async def check_domain(name: str) -> FilterCheckHostResponse:
+async def check_domain(
+    name: str,
+    no_cache: bool = False,
+    client: adguard.AdGuardClient = Depends(get_adguard_client)
+) -> Response:
     """Check if a domain is blocked by AdGuard Home according to spec."""
+    name = adguard.normalize_domain(name)
     if not name:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Domain name is required"
+        raise AdGuardValidationError("Domain name is required")
+
+    logger.info("Checking domain: %s", name)
+    result = await client.check_domain(name, use_cache=not no_cache)
+    logger.debug("Domain check result: %s", result)
+    return model_response(result)
+
+
+@app.post(
+    "/control/filtering/check_host_batch",
+    response_model=List[CheckHostBatchItem],
+    responses={
+        200: {"description": "OK"},
+        400: {"description": "Bad Request", "model": ErrorResponse},
+        503: {"description": "AdGuard Home service unavailable", "model": ErrorResponse}
+    },
+    tags=["filtering"]
+)
+async def check_domains_batch(
+    request: CheckHostBatchRequest,
+    client: adguard.AdGuardClient = Depends(get_adguard_client)
+) -> List[CheckHostBatchItem]:
+    """Check several domains at once, reporting failures per domain."""
+    if not request.names:
+        raise AdGuardValidationError("Domain names are required")
+    # Each name costs one check_host call per parent domain, so bound the total upstream work
+    names = {adguard.normalize_domain(name) for name in request.names}
+    # Single-label names have no parent domains but are still checked themselves
+    lookups = sum(len(adguard.get_parent_domains(name)) or 1 for name in names if adguard.validate_domain(name))
+    if lookups > adguard.CHECK_BATCH_MAX_LOOKUPS:
+        raise AdGuardValidationError(
+            f"Batch needs {lookups} upstream lookups, at most {adguard.CHECK_BATCH_MAX_LOOKUPS} allowed"
         )
 
-    logger.info(f"Checking domain: {name}")
-    try:
-        async with adguard.AdGuardClient() as client:
-            result = await client.check_domain(name)
-            logger.info(f"Domain check result: {result}")
-            return result
-    except AdGuardValidationError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        ) from e
-    except Exception as e:
-        logger.error(f"Error checking domain {name}: {str(e)}")
-        raise
+    logger.info("Checking %d domains", len(request.names))
+    # Duplicate names share one upstream lookup through the client's in-flight coalescing
+    results = await client.check_domains(request.names, return_exceptions=True)
+    items = []
+    for name, result in zip(request.names, results):
+        if isinstance(result, AdGuardError):
+            items.append(CheckHostBatchItem(name=name, error=str(result)))
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            items.append(CheckHostBatchItem(name=name, result=result))
+    return items
 
 
 @app.post(
     "/control/filtering/set_rules",
-    response_model=Dict,
+    response_model=MessageResponse,
     responses={
         200: {"description": "OK"},
         400: {"description": "Bad Request", "model": ErrorResponse},
@@ -134,7 +291,10 @@ async def check_domain(name: str) -> FilterCheckHostResponse:
     },
     tags=["filtering"]
 )
-async def add_to_whitelist(request: SetRulesRequest) -> Dict:
+async def add_to_whitelist(
+    request: SetRulesRequest,
+    client: adguard.AdGuardClient = Depends(get_adguard_client)
+) -> MessageResponse:
     """Add rules using set_rules endpoint according to AdGuard spec."""
     if not request.rules:
         raise HTTPException(
@@ -142,59 +302,54 @@ async def add_to_whitelist(request: SetRulesRequest) -> Dict:
             detail="Rules are required"
         )
 
-    # Extract domain from whitelist rule
+    # Extract domain from whitelist rule, refusing oversized input before matching it
     rule = request.rules[0]
-    if not rule.startswith("@@||") or not rule.endswith("^"):
+    match = len(rule) <= adguard.RULE_MAX_LENGTH and WHITELIST_RULE_RE.match(rule)
+    if not match:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid whitelist rule format"
         )
 
-    domain = rule[4:-1]  # Remove @@|| prefix and ^ suffix
-    logger.info(f"Adding domain to whitelist: {domain}")
-
-    try:
-        async with adguard.AdGuardClient() as client:
-            success = await client.add_allowed_domain(domain)
-            if success:
-                return {"message": f"Domain {domain} added to whitelist"}
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to add domain to whitelist"
-                )
-    except AdGuardValidationError as e:
+    domain = match["domain"]
+    logger.info("Adding domain to whitelist: %s", domain)
+
+    success = await client.add_allowed_domain(domain)
+    if success:
+        return MessageResponse(message=f"Domain {domain} added to whitelist")
+    else:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        ) from e
-    except Exception as e:
-        logger.error(f"Error adding domain to whitelist: {str(e)}")
-        raise
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to add domain to whitelist"
+        )
 
 
 @app.get(
     "/control/filtering/status",
-    response_model=FilterStatus,
+    response_model=None,
     responses={
-        200: {"description": "OK"},
+        200: {"description": "OK", "model": FilterStatus},
         503: {"description": "AdGuard Home service unavailable", "model": ErrorResponse}
     },
     tags=["filtering"]
 )
-async def get_filtering_status() -> FilterStatus:
+async def get_filtering_status(
+    request: Request,
+    no_cache: bool = False,
+    client: adguard.AdGuardClient = Depends(get_adguard_client)
+) -> Response:
     """Get filtering status according to AdGuard spec."""
-    try:
-        async with adguard.AdGuardClient() as client:
-            return await client.get_filter_status()
-    except Exception as e:
-        logger.error(f"Error getting filter status: {str(e)}")
-        raise
+    filter_status = await client.get_filter_status(use_cache=not no_cache)
+    body, etag = encode_filter_status(request.app, filter_status)
+    headers = {"ETag": etag, "Cache-Control": STATUS_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @app.get(
     "/control/filtering/unblock_host",
-    response_model=Dict,
+    response_model=MessageResponse,
     responses={
         200: {"description": "OK"},
         400: {"description": "Bad Request", "model": ErrorResponse},
@@ -202,75 +357,89 @@ async def get_filtering_status() -> FilterStatus:
     },
     tags=["filtering"]
 )
-async def unblock_host(name: str) -> Dict:
+async def unblock_host(
+    name: str,
+    client: adguard.AdGuardClient = Depends(get_adguard_client)
+) -> MessageResponse:
     """Unblock a domain by adding it to the whitelist if it's blocked."""
+    name = adguard.normalize_domain(name)
     if not name:
+        raise AdGuardValidationError("Domain name is required")
+    # Reject malformed names before the whitelist lookup touches AdGuard Home
+    if not adguard.validate_domain(name):
+        raise AdGuardValidationError(f"Invalid domain format: {name}")
+
+    logger.info("Checking domain status: %s", name)
+    # Check the (usually cached) whitelist first so repeat unblocks skip the domain check
+    user_rules = await client.get_user_rules()
+    whitelist_rule = WHITELIST_RULE_TEMPLATE.format(name)
+    if whitelist_rule in user_rules:
+        return MessageResponse(message=f"Domain {name} is already unblocked")
+
+    # Not whitelisted, so check whether the domain is actually blocked
+    check_result = await client.check_domain(name)
+
+    # If domain isn't blocked, there is nothing to unblock
+    if check_result.reason != "FilteredBlackList":
+        return MessageResponse(message=f"Domain {name} is not blocked (Status: {check_result.reason})")
+
+    # Domain is blocked and not in whitelist, proceed with unblocking
+    success = await client.add_allowed_domain(name)
+    if success:
+        return MessageResponse(message=f"Domain {name} has been unblocked")
+    else:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Domain name is required"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to unblock domain"
         )
 
-    logger.info(f"Checking domain status: {name}")
-    try:
-        async with adguard.AdGuardClient() as client:
-            # First check if domain is blocked
-            check_result = await client.check_domain(name)
-            
-            # If domain isn't blocked, no need to check whitelist or do anything else
-            if check_result.reason != "FilteredBlackList":
-                return {"message": f"Domain {name} is not blocked (Status: {check_result.reason})"}
-            
-            # Domain is blocked, check if it's already in whitelist
-            status_rules = await client.get_filter_status()
-            whitelist_rule = f"@@||{name}^"
-            if status_rules.user_rules and whitelist_rule in status_rules.user_rules:
-                return {"message": f"Domain {name} is already unblocked"}
-            
-            # Domain is blocked and not in whitelist, proceed with unblocking
-            success = await client.add_allowed_domain(name)
-            if success:
-                return {"message": f"Domain {name} has been unblocked"}
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to unblock domain"
-                )
-    except AdGuardValidationError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        ) from e
-    except Exception as e:
-        logger.error(f"Error unblocking domain: {str(e)}")
-        raise
+
+# HTTP status for each AdGuard exception type; subclasses resolve through their MRO
+ADGUARD_ERROR_STATUS = {
+    AdGuardConnectionError: status.HTTP_503_SERVICE_UNAVAILABLE,
+    AdGuardValidationError: status.HTTP_400_BAD_REQUEST,
+    AdGuardAPIError: status.HTTP_502_BAD_GATEWAY,
+}
 
 
 @app.exception_handler(AdGuardError)
-async def adguard_exception_handler(_request: Request, exc: AdGuardError) -> JSONResponse:
+async def adguard_exception_handler(_request: Request, exc: AdGuardError) -> ORJSONResponse:
     """Handle AdGuard-related exceptions according to spec."""
-    if isinstance(exc, AdGuardConnectionError):
-        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-    elif isinstance(exc, AdGuardValidationError):
-        status_code = status.HTTP_400_BAD_REQUEST
-    elif isinstance(exc, AdGuardAPIError):
-        status_code = status.HTTP_502_BAD_GATEWAY
+    for cls in type(exc).__mro__:
+        status_code = ADGUARD_ERROR_STATUS.get(cls)
+        if status_code is not None:
+            break
     else:
         status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={"message": str(exc)}
     )
 
 
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    """Log unexpected errors once and return a generic error response."""
+    logger.error("Unhandled error on %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={"message": "Internal server error"}
+    )
+
+
 def start():
     """Start the application using uvicorn."""
-    import uvicorn  # type: ignore
     uvicorn.run(
-        app,
+        "simpleguardhome.main:app",  # Import string so multiple workers can be spawned
         host="0.0.0.0",
         port=8000,
-        reload=False  # Disable reload in Docker
+        workers=settings.WEB_CONCURRENCY,
+        loop="auto",  # uvloop when installed
+        http="auto",  # httptools when installed
+        reload=False,  # Disable reload in Docker
+        access_log=settings.ACCESS_LOG,
+        log_config=LOGGING_CONFIG
     )
 
 
@@ -0,0 +1,206 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+
+from simpleguardhome import adguard
+
+
+class FakeAdGuard:
+    """Minimal AdGuard Home stand-in served through httpx.MockTransport."""
+
+    def __init__(self):
+        self.reasons = {}
+        self.user_rules = []
+        self.check_calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.started = asyncio.Event()
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/filtering/check_host"):
+            name = request.url.params["name"]
+            self.check_calls.append(name)
+            self.started.set()
+            await self.release.wait()
+            return httpx.Response(200, json={"reason": self.reasons.get(name, "NotFilteredNotFound")})
+        if request.url.path.endswith("/filtering/status"):
+            self.started.set()
+            await self.release.wait()
+            return httpx.Response(200, json={"enabled": True, "user_rules": list(self.user_rules)})
+        return httpx.Response(404)
+
+
+@pytest_asyncio.fixture
+async def fake_adguard(monkeypatch):
+    fake = FakeAdGuard()
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+    monkeypatch.setattr(adguard, "_http_client", http_client)
+    monkeypatch.setattr(adguard, "_http_client_loop", asyncio.get_running_loop())
+    yield fake
+    await http_client.aclose()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(adguard, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.mark.asyncio
+async def test_concurrent_checks_share_one_lookup(fake_adguard):
+    client = adguard.AdGuardClient()
+    fake_adguard.release.clear()
+
+    checks = [asyncio.ensure_future(client.check_domain("Example.com")) for _ in range(5)]
+    await fake_adguard.started.wait()
+    fake_adguard.release.set()
+    results = await asyncio.gather(*checks)
+
+    assert fake_adguard.check_calls == ["example.com"]
+    assert all(result is results[0] for result in results)
+    assert client._inflight_checks == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_fail_other_waiters(fake_adguard):
+    client = adguard.AdGuardClient()
+    fake_adguard.release.clear()
+
+    first = asyncio.ensure_future(client.check_domain("example.com"))
+    await fake_adguard.started.wait()
+    second = asyncio.ensure_future(client.check_domain("example.com"))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    fake_adguard.release.set()
+    result = await second
+
+    assert first.cancelled()
+    assert result.reason == "NotFilteredNotFound"
+    assert fake_adguard.check_calls == ["example.com"]
+
+
+@pytest.mark.asyncio
+async def test_cached_result_is_reused_until_it_expires(fake_adguard, clock):
+    client = adguard.AdGuardClient()
+
+    result = await client.check_domain("example.com")
+    await client.check_domain("example.com")
+    assert fake_adguard.check_calls == ["example.com"]
+
+    clock[0] += adguard.check_cache_ttl(result) + 1
+    await client.check_domain("example.com")
+    assert fake_adguard.check_calls == ["example.com", "example.com"]
+
+
+@pytest.mark.asyncio
+async def test_use_cache_false_bypasses_cached_result(fake_adguard, clock):
+    client = adguard.AdGuardClient()
+
+    await client.check_domain("example.com")
+    await client.check_domain("example.com", use_cache=False)
+    assert fake_adguard.check_calls == ["example.com", "example.com"]
+
+
+@pytest.mark.asyncio
+async def test_status_fetched_before_invalidation_is_not_cached(fake_adguard):
+    client = adguard.AdGuardClient()
+    fake_adguard.release.clear()
+
+    fetch = asyncio.ensure_future(client.get_filter_status())
+    await fake_adguard.started.wait()
+    client.invalidate_cache()
+    fake_adguard.release.set()
+    await fetch
+
+    assert client._status_cache is None
+
+
+@pytest.mark.asyncio
+async def test_check_fetched_before_invalidation_is_not_cached(fake_adguard):
+    client = adguard.AdGuardClient()
+    fake_adguard.release.clear()
+
+    check = asyncio.ensure_future(client.check_domain("example.com"))
+    await fake_adguard.started.wait()
+    client.invalidate_cache()
+    fake_adguard.release.set()
+    await check
+
+    assert "example.com" not in client._check_cache
+    await client.check_domain("example.com")
+    assert fake_adguard.check_calls == ["example.com", "example.com"]
+
+
+@pytest.mark.asyncio
+async def test_zero_check_cache_ttl_disables_caching(fake_adguard, monkeypatch):
+    monkeypatch.setattr(adguard, "CHECK_CACHE_TTL", 0.0)
+    monkeypatch.setattr(adguard, "CHECK_CACHE_NOT_FOUND_TTL", 0.0)
+    monkeypatch.setattr(adguard, "CHECK_CACHE_ERROR_TTL", 0.0)
+    client = adguard.AdGuardClient()
+    fake_adguard.reasons["blocked.com"] = "FilteredBlackList"
+
+    for name in ("example.com", "example.com", "blocked.com", "blocked.com"):
+        await client.check_domain(name)
+
+    assert fake_adguard.check_calls == ["example.com", "example.com", "blocked.com", "blocked.com"]
+    assert not client._check_cache
+
+
+@pytest.mark.asyncio
+async def test_add_allowed_domains_normalizes_and_dedupes(fake_adguard, monkeypatch, tmp_path):
+    monkeypatch.setattr(adguard, "RULES_BACKUP_DIR", tmp_path)
+    written = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/filtering/status"):
+            return httpx.Response(200, json={"enabled": True, "user_rules": ["@@||Existing.com^"]})
+        written.append(orjson.loads(request.content)["rules"])
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        monkeypatch.setattr(adguard, "_http_client", http_client)
+        client = adguard.AdGuardClient()
+        assert await client.add_allowed_domains(["Example.com.", "example.com", "existing.com"])
+
+    assert written == [["@@||Existing.com^", "@@||example.com^"]]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_backups_do_not_collide(monkeypatch, tmp_path):
+    monkeypatch.setattr(adguard, "RULES_BACKUP_DIR", tmp_path)
+    monkeypatch.setattr(adguard, "_backup_dir_ready", True)
+
+    for _ in range(5):
+        paths = await asyncio.gather(
+            *(asyncio.to_thread(adguard.save_rules_backup, [f"rule{i}"], "before") for i in range(8))
+        )
+        assert len(set(paths)) == len(paths)
+        assert [adguard.load_rules_backup(path) for path in paths] == [[f"rule{i}"] for i in range(8)]
+
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_whitelist_updates_keep_every_rule(fake_adguard, monkeypatch, tmp_path):
+    monkeypatch.setattr(adguard, "RULES_BACKUP_DIR", tmp_path)
+    user_rules = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/filtering/status"):
+            return httpx.Response(200, json={"enabled": True, "user_rules": list(user_rules)})
+        await asyncio.sleep(0.01)
+        user_rules[:] = orjson.loads(request.content)["rules"]
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        monkeypatch.setattr(adguard, "_http_client", http_client)
+        client = adguard.AdGuardClient()
+        await asyncio.gather(*(client.add_allowed_domain(f"host{i}.example.com") for i in range(5)))
+
+    assert sorted(user_rules) == sorted(f"@@||host{i}.example.com^" for i in range(5))
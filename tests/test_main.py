@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from simpleguardhome import adguard
+from simpleguardhome.main import app
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(adguard, "STATUS_REFRESH_INTERVAL", 0)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("path", ["/control/filtering/check_host", "/control/filtering/unblock_host"])
+def test_invalid_domain_returns_message(api, path):
+    response = api.get(path, params={"name": "not a domain"})
+
+    assert response.status_code == 400
+    assert response.json() == {"message": "Invalid domain format: not a domain"}
+
+
+@pytest.mark.parametrize("path", ["/control/filtering/check_host", "/control/filtering/unblock_host"])
+def test_missing_domain_returns_message(api, path):
+    response = api.get(path, params={"name": "  "})
+
+    assert response.status_code == 400
+    assert response.json() == {"message": "Domain name is required"}
+
+
+def test_batch_rejects_oversized_names(api):
+    response = api.post("/control/filtering/check_host_batch", json={"names": ["a" * 1000]})
+
+    assert response.status_code == 422
+
+
+def test_batch_rejects_too_many_names(api):
+    names = [f"host{i}.example.com" for i in range(adguard.CHECK_BATCH_MAX_NAMES + 1)]
+    response = api.post("/control/filtering/check_host_batch", json={"names": names})
+
+    assert response.status_code == 422
+
+
+def test_batch_bounds_upstream_lookups(api):
+    names = [f"{i}." + "a." * 10 + "example.com" for i in range(adguard.CHECK_BATCH_MAX_NAMES)]
+    response = api.post("/control/filtering/check_host_batch", json={"names": names})
+
+    assert response.status_code == 400
+    assert "upstream lookups" in response.json()["message"]
+
+
+def test_batch_counts_single_label_names_as_lookups(api, monkeypatch):
+    monkeypatch.setattr(adguard, "CHECK_BATCH_MAX_LOOKUPS", 2)
+    response = api.post("/control/filtering/check_host_batch", json={"names": ["alpha", "beta", "gamma"]})
+
+    assert response.status_code == 400
+    assert response.json()["message"] == "Batch needs 3 upstream lookups, at most 2 allowed"